@@ -5,16 +5,22 @@ Script to display JSON outputs from test.jsonl
 import json
 import sys
 
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # orjson is optional, fall back to the stdlib parser
+    _loads = json.loads
+
 def display_outputs(file_path, limit=None):
     """Display the output field from each line in the JSONL file"""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
+        with open(file_path, 'rb') as f:
             for i, line in enumerate(f, 1):
                 if limit and i > limit:
                     break
                     
-                data = json.loads(line.strip())
-                output = json.loads(data['output'])
+                data = _loads(line)
+                output = _loads(data['output'])
                 
                 print(f"\n{'='*80}")
                 print(f"Example {i}")
@@ -3,18 +3,72 @@
 Real-time logger for LLM outputs
 Logs every complaint submission with input, output, and metadata
 """
+import atexit
+import hashlib
 import json
+import logging
+import mmap
 import os
-from datetime import datetime
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to the stdlib encoder
+    orjson = None
+
+
+def _dumps(obj):
+    """Serialize an object to UTF-8 encoded JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+
+def _loads(data):
+    """Parse JSON from bytes or str"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# Buffered entries are written out once this many bytes are pending,
+# or after FLUSH_INTERVAL seconds, whichever comes first
+FLUSH_THRESHOLD = 64 * 1024
+FLUSH_INTERVAL = 0.5
+
+_UTC = timezone.utc
+
+logger = logging.getLogger(__name__)
+
+
 class GrievanceLogger:
     """Logger for real-time LLM outputs"""
     
     def __init__(self, log_file="LLM/grievance_outputs.jsonl"):
         """Initialize logger with output file path"""
         self.log_file = log_file
+        self.stats_file = str(Path(log_file).with_suffix('.stats.json'))
         self.ensure_log_directory()
+        
+        # Raw append-only descriptor: each write(2) lands atomically at the end of
+        # the file, even with several processes (e.g. gunicorn workers) logging
+        self._fd = self._open_log()
+        
+        # Write-back buffer, drained by size, timer or at interpreter exit
+        self._buf = bytearray()
+        self._lock = threading.Lock()
+        self._timer = None
+        self._n_logged = 0
+        atexit.register(self.close)
+    
+    def _open_log(self):
+        """Open the log file for appending at the file descriptor level"""
+        flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, 'O_CLOEXEC', 0) | getattr(os, 'O_BINARY', 0)
+        return os.open(self.log_file, flags, 0o644)
     
     def ensure_log_directory(self):
         """Create log directory if it doesn't exist"""
@@ -42,11 +96,13 @@ class GrievanceLogger:
         Returns:
             dict: The logged entry
         """
-        timestamp = datetime.utcnow().isoformat() + 'Z'
+        ts_ns = time.time_ns()
+        timestamp = datetime.fromtimestamp(ts_ns / 1e9, _UTC).isoformat().replace('+00:00', 'Z')
         
         # Create log entry
         entry = {
             "timestamp": timestamp,
+            "ts_ns": ts_ns,
             "user_input": user_input,
             "output": llm_output,
             "metadata": {
@@ -62,56 +118,145 @@ class GrievanceLogger:
         if additional_metadata:
             entry["metadata"].update(additional_metadata)
         
-        # Append to JSONL file (one JSON object per line)
-        with open(self.log_file, 'a', encoding='utf-8') as f:
-            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        # Buffer the JSONL line (one JSON object per line)
+        line = _dumps(entry) + b'\n'
+        with self._lock:
+            self._buf += line
+            pending = len(self._buf)
+            self._n_logged += 1
+            n_logged = self._n_logged
+            if pending < FLUSH_THRESHOLD and self._timer is None:
+                self._timer = threading.Timer(FLUSH_INTERVAL, self._flush)
+                self._timer.daemon = True
+                self._timer.start()
+        
+        if pending >= FLUSH_THRESHOLD:
+            self._flush()
         
-        print(f"✓ Logged entry at {timestamp}")
+        # Per-entry messages only at DEBUG, plus a heartbeat every 256 entries
+        logger.debug("Logged entry at %s", timestamp)
+        if n_logged & 0xFF == 0:
+            logger.info("✓ Logged %d entries", n_logged)
         return entry
     
+    def _flush(self):
+        """Write any buffered entries to the log file"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._buf:
+                return
+            chunk, self._buf = self._buf, bytearray()
+            
+            if self._fd is None:
+                self._fd = self._open_log()
+            
+            # The whole batch goes out in one write; loop only on a short write
+            view = memoryview(chunk)
+            while view:
+                view = view[os.write(self._fd, view):]
+    
+    def close(self):
+        """Flush buffered entries and close the log file"""
+        self._flush()
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+    
     def get_recent_logs(self, limit=10):
         """Retrieve recent log entries"""
+        self._flush()
         if not os.path.exists(self.log_file):
             return []
         
         logs = []
-        with open(self.log_file, 'r', encoding='utf-8') as f:
+        with open(self.log_file, 'rb') as f:
             for line in f:
-                logs.append(json.loads(line.strip()))
+                logs.append(_loads(line))
         
         return logs[-limit:]
     
     def get_statistics(self):
         """Get statistics from all logged entries"""
+        self._flush()
         if not os.path.exists(self.log_file):
             return {"total": 0}
         
-        stats = {
-            "total": 0,
-            "departments": {},
-            "severities": {},
-            "voice_inputs": 0,
-            "with_location": 0,
-        }
-        
-        with open(self.log_file, 'r', encoding='utf-8') as f:
-            for line in f:
-                entry = json.loads(line.strip())
-                stats["total"] += 1
-                
-                output = entry["output"]
-                dept = output.get("department", "unknown")
-                sev = output.get("severity", "unknown")
+        # Counts up to `offset` come from the sidecar cache, only newer bytes are scanned
+        cache = self._load_stats_cache()
+        with open(self.log_file, 'rb') as f:
+            st = os.fstat(f.fileno())
+            if st.st_size == 0:
+                return {"total": 0}
+            
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                # The cache is only valid for the same file (not one deleted or rotated
+                # and recreated since), cut at a line boundary it has already counted
+                first_line = mm[:mm.find(b'\n') + 1 or len(mm)]
+                identity = [st.st_dev, st.st_ino, hashlib.sha1(first_line).hexdigest()]
+                if (cache is None
+                        or cache.get("identity") != identity
+                        or cache["offset"] > st.st_size
+                        or (cache["offset"] > 0 and mm[cache["offset"] - 1:cache["offset"]] != b'\n')):
+                    cache = {"offset": 0, "departments": {}, "severities": {}, "voice_inputs": 0, "with_location": 0}
                 
-                stats["departments"][dept] = stats["departments"].get(dept, 0) + 1
-                stats["severities"][sev] = stats["severities"].get(sev, 0) + 1
+                departments = Counter(cache["departments"])
+                severities = Counter(cache["severities"])
+                voice_inputs = cache["voice_inputs"]
+                with_location = cache["with_location"]
+                offset = cache["offset"]
                 
-                if entry["metadata"].get("voice_input"):
-                    stats["voice_inputs"] += 1
-                if entry["metadata"].get("has_location"):
-                    stats["with_location"] += 1
+                # Stop at the last complete line
+                end = mm.rfind(b'\n', offset) + 1
+                for line in mm[offset:end].split(b'\n'):
+                    if not line:
+                        continue
+                    entry = _loads(line)
+                    output = entry["output"]
+                    metadata = entry["metadata"]
+                    
+                    departments[output.get("department", "unknown")] += 1
+                    severities[output.get("severity", "unknown")] += 1
+                    
+                    if metadata.get("voice_input"):
+                        voice_inputs += 1
+                    if metadata.get("has_location"):
+                        with_location += 1
+        
+        if end > offset or cache.get("identity") != identity:
+            self._save_stats_cache({
+                "identity": identity,
+                "offset": max(end, offset),
+                "departments": departments,
+                "severities": severities,
+                "voice_inputs": voice_inputs,
+                "with_location": with_location,
+            })
         
-        return stats
+        return {
+            "total": sum(departments.values()),
+            "departments": dict(departments),
+            "severities": dict(severities),
+            "voice_inputs": voice_inputs,
+            "with_location": with_location,
+        }
+    
+    def _load_stats_cache(self):
+        """Read cached statistics, or None if missing or unreadable"""
+        try:
+            with open(self.stats_file, 'rb') as f:
+                return _loads(f.read())
+        except (OSError, ValueError):
+            return None
+    
+    def _save_stats_cache(self, cache):
+        """Atomically replace the cached statistics"""
+        tmp_file = f"{self.stats_file}.tmp"
+        with open(tmp_file, 'wb') as f:
+            f.write(_dumps(cache))
+        os.replace(tmp_file, self.stats_file)
 
 
 # Example usage function
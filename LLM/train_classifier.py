@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Fine-tune small encoder classifiers for grievance categorization
+Trains one DistilBERT model per field (department, severity) on train.jsonl
+"""
+import json
+import sys
+
+import numpy as np
+import torch
+from transformers import (
+    AutoModelForSequenceClassification,
+    AutoTokenizer,
+    Trainer,
+    TrainingArguments,
+)
+
+BASE_MODEL = "distilbert-base-multilingual-cased"
+TRAIN_FILE = "LLM/train.jsonl"
+VAL_FILE = "LLM/val.jsonl"
+OUTPUT_DIR = "LLM/classifiers"
+
+# Label sets, matching the fields of the structured grievance output
+LABELS = {
+    "department": ["roads_and_traffic", "water_supply", "solid_waste_management"],
+    "severity": ["low", "medium", "high", "critical"],
+}
+
+
+class GrievanceDataset(torch.utils.data.Dataset):
+    """Tokenized complaints with one label per example"""
+
+    def __init__(self, encodings, labels):
+        self.encodings = encodings
+        self.labels = labels
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __getitem__(self, idx):
+        item = {key: torch.tensor(values[idx]) for key, values in self.encodings.items()}
+        item["labels"] = torch.tensor(self.labels[idx])
+        return item
+
+
+def load_examples(file_path, field):
+    """Read (input text, label) pairs for one output field from a JSONL file"""
+    texts, labels = [], []
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            data = json.loads(line)
+            output = json.loads(data['output'])
+            texts.append(data['input'])
+            labels.append(output[field])
+    return texts, labels
+
+
+def compute_metrics(eval_pred):
+    """Accuracy over the evaluation set"""
+    logits, labels = eval_pred
+    return {"accuracy": float((np.argmax(logits, axis=-1) == labels).mean())}
+
+
+def train_classifier(field, epochs=3):
+    """Fine-tune and save a classifier for one field"""
+    labels = LABELS[field]
+    label2id = {label: i for i, label in enumerate(labels)}
+    output_dir = f"{OUTPUT_DIR}/{field}"
+
+    tokenizer = AutoTokenizer.from_pretrained(BASE_MODEL)
+    model = AutoModelForSequenceClassification.from_pretrained(
+        BASE_MODEL,
+        num_labels=len(labels),
+        id2label=dict(enumerate(labels)),
+        label2id=label2id,
+    )
+
+    def encode(file_path):
+        texts, values = load_examples(file_path, field)
+        encodings = tokenizer(texts, truncation=True, max_length=128, padding=True)
+        return GrievanceDataset(encodings, [label2id[v] for v in values])
+
+    args = TrainingArguments(
+        output_dir=output_dir,
+        num_train_epochs=epochs,
+        per_device_train_batch_size=32,
+        learning_rate=5e-5,
+        save_strategy="no",
+        report_to=[],
+    )
+    trainer = Trainer(
+        model=model,
+        args=args,
+        train_dataset=encode(TRAIN_FILE),
+        eval_dataset=encode(VAL_FILE),
+        compute_metrics=compute_metrics,
+    )
+
+    print(f"\nTraining {field} classifier...")
+    trainer.train()
+    print(f"📊 {field}: {trainer.evaluate()}")
+
+    trainer.save_model(output_dir)
+    tokenizer.save_pretrained(output_dir)
+    print(f"✓ Saved {field} classifier to {output_dir}")
+
+
+if __name__ == "__main__":
+    epochs = 3
+    if len(sys.argv) > 1:
+        try:
+            epochs = int(sys.argv[1])
+        except ValueError:
+            print("Usage: python train_classifier.py [epochs]")
+            sys.exit(1)
+
+    for field in LABELS:
+        train_classifier(field, epochs)
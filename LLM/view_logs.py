@@ -4,52 +4,74 @@ View and analyze logged grievance outputs
 """
 import json
 import sys
-from datetime import datetime
+from collections import Counter, deque
+from datetime import datetime, timezone
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # orjson is optional, fall back to the stdlib parser
+    _loads = json.loads
+
+SEVERITY_ORDER = ('low', 'medium', 'high', 'critical')
+
+_UTC = timezone.utc
+
+def print_entry(i, entry):
+    """Print a single logged entry"""
+    user_input = entry['user_input']
+    output = entry['output']
+    metadata = entry['metadata']
+    
+    # Entries logged before ts_ns was added only have the ISO timestamp
+    if 'ts_ns' in entry:
+        dt = datetime.fromtimestamp(entry['ts_ns'] / 1e9, _UTC)
+    else:
+        dt = datetime.fromisoformat(entry['timestamp'].replace('Z', '+00:00'))
+    time_str = dt.strftime('%Y-%m-%d %H:%M:%S UTC')
+    
+    print(f"Entry #{i} - {time_str}")
+    print(f"{'-'*80}")
+    
+    # User info
+    if metadata.get('user_id'):
+        print(f"👤 User: {metadata['user_id']}")
+    if metadata.get('voice_input'):
+        print(f"🎤 Voice Input: Yes")
+    
+    # Input
+    print(f"\n📝 Input: {user_input}")
+    
+    # Output
+    print(f"\n📤 Output:")
+    print(f"   Department: {output['department']}")
+    print(f"   Location: {output['location'] or '(not specified)'}")
+    print(f"   Severity: {output['severity'].upper()}")
+    print(f"   Description: {output['description']}")
+    print(f"   Summary: {output['summary']}")
+    
+    print(f"\n{'='*80}\n")
 
 def view_logs(log_file="LLM/grievance_outputs.jsonl", limit=None):
     """Display logged entries in readable format"""
     try:
-        with open(log_file, 'r', encoding='utf-8') as f:
-            entries = [json.loads(line) for line in f]
-        
-        if limit:
-            entries = entries[-limit:]
-        
-        print(f"\n{'='*80}")
-        print(f"GRIEVANCE OUTPUT LOGS ({len(entries)} entries)")
-        print(f"{'='*80}\n")
-        
-        for i, entry in enumerate(entries, 1):
-            timestamp = entry['timestamp']
-            user_input = entry['user_input']
-            output = entry['output']
-            metadata = entry['metadata']
-            
-            # Parse timestamp
-            dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-            time_str = dt.strftime('%Y-%m-%d %H:%M:%S UTC')
-            
-            print(f"Entry #{i} - {time_str}")
-            print(f"{'-'*80}")
-            
-            # User info
-            if metadata.get('user_id'):
-                print(f"👤 User: {metadata['user_id']}")
-            if metadata.get('voice_input'):
-                print(f"🎤 Voice Input: Yes")
-            
-            # Input
-            print(f"\n📝 Input: {user_input}")
+        with open(log_file, 'rb') as f:
+            if limit:
+                # Only the last `limit` entries are kept in memory
+                entries = deque((_loads(line) for line in f), maxlen=limit)
+                total = len(entries)
+            else:
+                # Count lines first, then stream entries without storing them
+                total = sum(1 for _ in f)
+                f.seek(0)
+                entries = (_loads(line) for line in f)
             
-            # Output
-            print(f"\n📤 Output:")
-            print(f"   Department: {output['department']}")
-            print(f"   Location: {output['location'] or '(not specified)'}")
-            print(f"   Severity: {output['severity'].upper()}")
-            print(f"   Description: {output['description']}")
-            print(f"   Summary: {output['summary']}")
+            print(f"\n{'='*80}")
+            print(f"GRIEVANCE OUTPUT LOGS ({total} entries)")
+            print(f"{'='*80}\n")
             
-            print(f"\n{'='*80}\n")
+            for i, entry in enumerate(entries, 1):
+                print_entry(i, entry)
         
     except FileNotFoundError:
         print(f"❌ Log file not found: {log_file}")
@@ -59,43 +81,36 @@ def view_logs(log_file="LLM/grievance_outputs.jsonl", limit=None):
 def show_statistics(log_file="LLM/grievance_outputs.jsonl"):
     """Show statistics from logs"""
     try:
-        with open(log_file, 'r', encoding='utf-8') as f:
-            entries = [json.loads(line) for line in f]
+        departments = Counter()
+        severities = Counter()
+        voice_inputs = 0
+        with_location = 0
         
+        # Stream the file once instead of loading every entry into memory
+        with open(log_file, 'rb') as f:
+            for line in f:
+                entry = _loads(line)
+                output = entry['output']
+                
+                departments[output['department']] += 1
+                severities[output['severity']] += 1
+                
+                if entry['metadata'].get('voice_input'):
+                    voice_inputs += 1
+                if output.get('location'):
+                    with_location += 1
+        
+        total = sum(departments.values())
         stats = {
-            "total": len(entries),
-            "departments": {},
-            "severities": {},
-            "voice_inputs": 0,
-            "text_inputs": 0,
-            "with_location": 0,
-            "without_location": 0,
+            "total": total,
+            "departments": departments,
+            "severities": severities,
+            "voice_inputs": voice_inputs,
+            "text_inputs": total - voice_inputs,
+            "with_location": with_location,
+            "without_location": total - with_location,
         }
         
-        for entry in entries:
-            output = entry['output']
-            metadata = entry['metadata']
-            
-            # Count departments
-            dept = output['department']
-            stats['departments'][dept] = stats['departments'].get(dept, 0) + 1
-            
-            # Count severities
-            sev = output['severity']
-            stats['severities'][sev] = stats['severities'].get(sev, 0) + 1
-            
-            # Count input types
-            if metadata.get('voice_input'):
-                stats['voice_inputs'] += 1
-            else:
-                stats['text_inputs'] += 1
-            
-            # Count locations
-            if output.get('location'):
-                stats['with_location'] += 1
-            else:
-                stats['without_location'] += 1
-        
         print(f"\n{'='*80}")
         print(f"STATISTICS")
         print(f"{'='*80}\n")
@@ -108,8 +123,7 @@ def show_statistics(log_file="LLM/grievance_outputs.jsonl"):
             print(f"   {dept}: {count} ({pct:.1f}%)")
         
         print(f"\n⚠️  By Severity:")
-        severity_order = ['low', 'medium', 'high', 'critical']
-        for sev in severity_order:
+        for sev in SEVERITY_ORDER:
             count = stats['severities'].get(sev, 0)
             if count > 0:
                 pct = (count / stats['total'] * 100)
@@ -0,0 +1,25 @@
+"""
+Gunicorn configuration for the Grievance Processing Local Server
+
+A single worker keeps one copy of the model in memory; its threads let
+/health and fast-mode /categorize requests run while an LLM generation
+is in progress.
+"""
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+bind = f"0.0.0.0:{os.getenv('PORT', 5002)}"
+workers = 1
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+preload_app = True  # Import the app once in the master process
+timeout = 300  # CPU generation can take minutes
+
+
+def when_ready(arbiter):
+    """Load the models in the master before the worker is forked, so it inherits them"""
+    import server
+
+    if not server.load_startup_models():
+        raise RuntimeError(f"Failed to load default model {server.DEFAULT_MODEL}")
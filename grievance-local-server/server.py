@@ -4,15 +4,46 @@ Local Grievance Processing Server
 Runs the fine-tuned citizen grievance models locally
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
-from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline
+from transformers import (
+    AutoModelForCausalLM,
+    AutoTokenizer,
+    BitsAndBytesConfig,
+    StoppingCriteria,
+    StoppingCriteriaList,
+    TextIteratorStreamer,
+    pipeline,
+)
 import torch
 import os
+import json
 from dotenv import load_dotenv
 import logging
+import re
+import threading
+import time
+import gc
+import queue
+from concurrent.futures import Future
+from functools import lru_cache
 from pathlib import Path
 
+try:
+    import ahocorasick
+except ImportError:  # pyahocorasick is optional, quick_categorize falls back to substring scans
+    ahocorasick = None
+
+try:
+    from llama_cpp import Llama
+except ImportError:  # llama-cpp-python is optional, only needed for GGUF models
+    Llama = None
+
+try:
+    import intel_extension_for_pytorch as ipex
+except ImportError:  # IPEX is optional, only used to optimize unquantized models
+    ipex = None
+
 # IMPORTANT: Disable MPS (Metal Performance Shaders) on Mac BEFORE importing torch
 os.environ['PYTORCH_ENABLE_MPS_FALLBACK'] = '1'
 os.environ['PYTORCH_MPS_HIGH_WATERMARK_RATIO'] = '0.0'
@@ -47,32 +78,130 @@ MODELS = {
 
 DEFAULT_MODEL = os.getenv('DEFAULT_MODEL', 'llama')
 
+# Optional pre-quantized GGUF builds (e.g. Q4_K_M) run with llama.cpp,
+# configured per model as LLAMA_GGUF_PATH, MISTRAL_GGUF_PATH, QWEN_GGUF_PATH
+GGUF_MODELS = {key: os.getenv(f'{key.upper()}_GGUF_PATH') for key in MODELS}
+
 # Force CPU for Mac to avoid MPS memory issues
 # MPS (Metal Performance Shaders) on Mac can run out of memory with large models
 device = "cpu"
 torch_dtype = torch.float32
 
+# Unquantized models are optimized with IPEX in bfloat16 when it is installed
+# (best on CPUs with AVX-512 BF16 / AMX); TORCH_COMPILE=1 also compiles the forward pass
+USE_BF16 = ipex is not None and os.getenv('USE_BF16', '1') == '1'
+TORCH_COMPILE = os.getenv('TORCH_COMPILE', '0') == '1'
+
 # Uncomment below to use GPU if you have enough VRAM (16GB+)
 # device = "cuda:0" if torch.cuda.is_available() else "cpu"
 # torch_dtype = torch.float16 if torch.cuda.is_available() else torch.float32
 
-# Global variables for models
-models = {}
-tokenizers = {}
+# Optional fine-tuned encoder classifiers (see LLM/train_classifier.py) used by
+# /categorize instead of the generative model
+CLASSIFIER_MODELS = {
+    'department': os.getenv('DEPARTMENT_CLASSIFIER'),
+    'severity': os.getenv('SEVERITY_CLASSIFIER'),
+}
+
+# Classifier department labels mapped to the names used by the frontend
+CLASSIFIER_DEPARTMENTS = {
+    'water_supply': 'water',
+    'solid_waste_management': 'waste',
+    'roads_and_traffic': 'road',
+}
+
+# Global variables for models (each pipeline holds its model and tokenizer)
 pipes = {}
+classifiers = {}
+
+# Concurrent generation requests are coalesced into batches by a single worker
+# thread, so only one generation runs at a time; fast mode and health checks
+# never go through the queue and stay responsive during inference
+MAX_BATCH = int(os.getenv('MAX_BATCH', 8))
+MAX_WAIT_MS = int(os.getenv('MAX_WAIT_MS', 30))
+generation_queue = queue.Queue()
+generation_worker = None
+worker_lock = threading.Lock()
+load_lock = threading.Lock()
+
+class LlamaCppPipeline:
+    """Runs a GGUF model with llama.cpp behind the text-generation pipeline interface"""
+    
+    def __init__(self, model_path):
+        self.llm = Llama(model_path=model_path, n_threads=os.cpu_count(), n_ctx=2048, verbose=False)
+    
+    def __call__(self, prompts, max_new_tokens=150, temperature=0.5, top_p=0.9, do_sample=True, **kwargs):
+        if isinstance(prompts, list):
+            return [self(prompt, max_new_tokens, temperature, top_p, do_sample) for prompt in prompts]
+        
+        if not do_sample:
+            temperature = 0.0  # Greedy decoding
+        output = self.llm(prompts, max_tokens=max_new_tokens, temperature=temperature, top_p=top_p)
+        # Like the Transformers pipeline, the generated text includes the prompt
+        return [{'generated_text': prompts + output['choices'][0]['text']}]
+
+@lru_cache(maxsize=None)
+def _brace_deltas(tokenizer, vocab_size):
+    """Per-token brace counts indexed by token id: opening braces, net depth change,
+    and net depth change from the token's first opening brace onward"""
+    tokens = tokenizer.convert_ids_to_tokens(list(range(len(tokenizer))))
+    # The embedding can be larger than the tokenizer (padded vocabularies); the extra ids have no braces
+    tokens += [None] * (vocab_size - len(tokens))
+    opens = torch.tensor([(token or '').count('{') for token in tokens])
+    closes = torch.tensor([(token or '').count('}') for token in tokens])
+    from_open = [(token or '').partition('{') for token in tokens]
+    first_deltas = torch.tensor([
+        1 + rest.count('{') - rest.count('}') if sep else 0 for _, sep, rest in from_open
+    ])
+    return opens, opens - closes, first_deltas
+
+class JsonBraceBalance(StoppingCriteria):
+    """Stops each sequence once the first JSON object it generates is closed"""
+    
+    def __init__(self, tokenizer, vocab_size=0):
+        self.opens, self.deltas, self.first_deltas = _brace_deltas(tokenizer, max(len(tokenizer), vocab_size))
+        self.depth = None
+        self.opened = None
+    
+    def __call__(self, input_ids, scores, **kwargs):
+        # Called once per generated token, so only the last token needs checking
+        last = input_ids[:, -1].cpu()
+        if self.depth is None:
+            self.depth = torch.zeros_like(last)
+            self.opened = torch.zeros_like(last, dtype=torch.bool)
+        # Braces before the first '{' (e.g. a stray '}') don't count towards the depth
+        self.depth += torch.where(self.opened, self.deltas[last], self.first_deltas[last])
+        self.opened |= self.opens[last] > 0
+        return (self.opened & (self.depth <= 0)).to(input_ids.device)
 
 def load_model(model_key='llama'):
     """Load a specific grievance model"""
-    global models, tokenizers, pipes
-    
-    if model_key in pipes:
-        logger.info(f"Model {model_key} already loaded in memory")
+    try:
+        with load_lock:
+            _get_pipe(model_key)
         return True
-    
+    except Exception as e:
+        logger.error(f"Error loading model {model_key}: {str(e)}")
+        return False
+
+@lru_cache(maxsize=None)
+def _get_pipe(model_key):
+    """Load a grievance model once and return its pipeline (errors are raised, not cached)"""
     model_name = MODELS.get(model_key)
     if not model_name:
-        logger.error(f"Unknown model key: {model_key}")
-        return False
+        raise ValueError(f"Unknown model key: {model_key}")
+    
+    gguf_path = GGUF_MODELS.get(model_key)
+    if gguf_path and Llama is not None:
+        try:
+            logger.info(f"Loading GGUF model for {model_key} with llama.cpp: {gguf_path}")
+            pipes[model_key] = LlamaCppPipeline(gguf_path)
+            logger.info(f"Model {model_key} loaded successfully!")
+            return pipes[model_key]
+        except Exception as e:
+            logger.warning(f"Error loading GGUF model {gguf_path}: {str(e)} - falling back to Transformers")
+    elif gguf_path:
+        logger.warning(f"{model_key.upper()}_GGUF_PATH is set but llama-cpp-python is not installed - using Transformers")
     
     logger.info(f"Loading model: {model_name}")
     logger.info(f"Using device: {device}")
@@ -85,56 +214,175 @@ def load_model(model_key='llama'):
     else:
         logger.info(f"⬇️  Model {model_key} not in cache - will download (~7-8GB, one-time only)")
     
+    # Load tokenizer with cache
+    tokenizer = AutoTokenizer.from_pretrained(model_name, cache_dir=CACHE_DIR)
+    
+    # Set pad token if not present
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+        tokenizer.pad_token_id = tokenizer.eos_token_id
+    # Batched generation with a causal LM needs prompts padded on the left
+    tokenizer.padding_side = 'left'
+    
+    # Load model in 8-bit to cut weight memory and bandwidth (requires bitsandbytes)
+    logger.info("Loading model with 8-bit quantization to reduce memory usage...")
     try:
-        # Load tokenizer with cache
-        tokenizer = AutoTokenizer.from_pretrained(model_name, cache_dir=CACHE_DIR)
-        
-        # Set pad token if not present
-        if tokenizer.pad_token is None:
-            tokenizer.pad_token = tokenizer.eos_token
-            tokenizer.pad_token_id = tokenizer.eos_token_id
-        
-        # Load model with aggressive memory optimization
-        logger.info("Loading model with 8-bit quantization to reduce memory usage...")
         model = AutoModelForCausalLM.from_pretrained(
             model_name,
-            torch_dtype=torch.float32,  # Use float32 for CPU
+            quantization_config=BitsAndBytesConfig(load_in_8bit=True),
+            torch_dtype='auto',
             low_cpu_mem_usage=True,
-            device_map=None,  # Force CPU, no automatic device mapping
+            device_map='cpu',
             cache_dir=CACHE_DIR,
             use_cache=True,
-            # Reduce memory by loading in 8-bit (requires bitsandbytes)
-            load_in_8bit=False,  # Disabled for CPU compatibility
-            # Alternative: use smaller precision
         )
-        
-        # Explicitly move to CPU
-        model = model.to('cpu')
-        logger.info(f"✅ Model loaded successfully on CPU")
-        logger.info(f"Model memory footprint: ~{sum(p.numel() for p in model.parameters()) / 1e9:.2f}B parameters")
-        
-        # Create pipeline with optimized settings for faster inference
-        pipe = pipeline(
-            "text-generation",
-            model=model,
-            tokenizer=tokenizer,
-            max_new_tokens=150,  # Reduced for faster response
-            temperature=0.5,  # Lower for more focused output
-            top_p=0.9,
-            do_sample=True,
-            device='cpu',  # Explicit CPU
+        quantized = True
+    except Exception as e:
+        logger.warning(f"8-bit loading failed ({str(e)}) - loading unquantized weights")
+        # Weights load straight onto the CPU in their checkpoint dtype (no extra copy)
+        model = AutoModelForCausalLM.from_pretrained(
+            model_name,
+            torch_dtype='auto',
+            low_cpu_mem_usage=True,
+            device_map=None,  # Force CPU, no automatic device mapping
+            cache_dir=CACHE_DIR,
+            use_cache=True,
         )
+        quantized = False
         
-        models[model_key] = model
-        tokenizers[model_key] = tokenizer
-        pipes[model_key] = pipe
+        # Many CPU kernels have no float16 implementation; bfloat16 and float32 are kept as is
+        if model.dtype == torch.float16:
+            model = model.float()
         
-        logger.info(f"Model {model_key} loaded successfully!")
+        model.eval()
+        if USE_BF16:
+            logger.info("Optimizing model with IPEX (bfloat16)...")
+            model = ipex.optimize(model, dtype=torch.bfloat16, inplace=True)
+        if TORCH_COMPILE:
+            logger.info("Compiling model forward pass with torch.compile...")
+            # Default mode: 'reduce-overhead' only adds CUDA graphs, which don't apply on CPU
+            model.forward = torch.compile(model.forward)
+    
+    logger.info(f"✅ Model loaded successfully on CPU")
+    logger.info(f"Model memory footprint: ~{sum(p.numel() for p in model.parameters()) / 1e9:.2f}B parameters")
+    
+    # Create pipeline with optimized settings for faster inference
+    pipe_kwargs = {} if quantized else {'device': 'cpu'}  # Quantized models are already placed by device_map
+    pipe = pipeline(
+        "text-generation",
+        model=model,
+        tokenizer=tokenizer,
+        max_new_tokens=150,  # Reduced for faster response
+        temperature=0.5,  # Lower for more focused output
+        top_p=0.9,
+        do_sample=True,
+        **pipe_kwargs,
+    )
+    
+    pipes[model_key] = pipe
+    
+    # Release transient buffers left over from loading the weights
+    gc.collect()
+    
+    logger.info(f"Model {model_key} loaded successfully!")
+    return pipe
+
+def load_classifiers():
+    """Load the encoder classifiers if both are configured"""
+    if not all(CLASSIFIER_MODELS.values()):
+        logger.info("Encoder classifiers not configured - /categorize uses the generative model")
+        return False
+    
+    try:
+        for head, model_path in CLASSIFIER_MODELS.items():
+            logger.info(f"Loading {head} classifier: {model_path}")
+            classifiers[head] = pipeline('text-classification', model=model_path, device='cpu')
+        logger.info("Encoder classifiers loaded successfully!")
         return True
     except Exception as e:
-        logger.error(f"Error loading model {model_key}: {str(e)}")
+        logger.error(f"Error loading encoder classifiers: {str(e)}")
+        classifiers.clear()
         return False
 
+def _generation_loop():
+    """Drain the generation queue, running up to MAX_BATCH prompts per pipeline call"""
+    while True:
+        batch = [generation_queue.get()]
+        deadline = time.monotonic() + MAX_WAIT_MS / 1000
+        while len(batch) < MAX_BATCH:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(generation_queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        
+        # Only requests for the same model and generation settings share a call
+        groups = {}
+        for item in batch:
+            model_key, _, gen_kwargs, _ = item
+            groups.setdefault((model_key, tuple(sorted(gen_kwargs.items()))), []).append(item)
+        
+        for (model_key, gen_kwargs), items in groups.items():
+            prompts = [prompt for _, prompt, _, _ in items]
+            try:
+                pipe = pipes[model_key]
+                gen_kwargs = dict(gen_kwargs)
+                # Stopping criteria keep per-call state, so they are built for every call
+                if gen_kwargs.pop('stop_at_json', False) and hasattr(pipe, 'tokenizer'):
+                    gen_kwargs['stopping_criteria'] = StoppingCriteriaList([
+                        JsonBraceBalance(pipe.tokenizer, pipe.model.config.vocab_size)
+                    ])
+                # Models converted to bfloat16 run under autocast so activations match the weights
+                bf16 = getattr(getattr(pipe, 'model', None), 'dtype', None) == torch.bfloat16
+                with torch.inference_mode(), torch.autocast('cpu', dtype=torch.bfloat16, enabled=bf16):
+                    results = pipe(prompts, batch_size=len(prompts), **gen_kwargs)
+            except Exception as e:
+                for *_, future in items:
+                    future.set_exception(e)
+            else:
+                for (*_, future), result in zip(items, results):
+                    future.set_result(result)
+
+def submit_generation(model_key, prompt, **gen_kwargs):
+    """Queue a prompt for batched generation and return a Future for its pipeline result"""
+    global generation_worker
+    
+    # Started lazily: a thread started before gunicorn forks would not exist in the worker
+    with worker_lock:
+        if generation_worker is None or not generation_worker.is_alive():
+            generation_worker = threading.Thread(target=_generation_loop, name='generation-worker', daemon=True)
+            generation_worker.start()
+    
+    future = Future()
+    generation_queue.put((model_key, prompt, gen_kwargs, future))
+    return future
+
+def generate(model_key, prompt, **gen_kwargs):
+    """Queue a prompt for batched generation and wait for its pipeline result"""
+    return submit_generation(model_key, prompt, **gen_kwargs).result()
+
+def stream_generation(model_key, prompt, **gen_kwargs):
+    """Stream generated text as server-sent events while the worker runs the generation"""
+    streamer = TextIteratorStreamer(pipes[model_key].tokenizer, skip_prompt=True, skip_special_tokens=True)
+    # Each streamer is a distinct generation setting, so the request runs in its own pipeline call
+    future = submit_generation(model_key, prompt, streamer=streamer, **gen_kwargs)
+    # Unblock the event stream if generation fails before finishing the streamer
+    future.add_done_callback(lambda f: f.exception() is not None and streamer.end())
+    
+    def events():
+        for token in streamer:
+            if token:
+                yield f"data: {json.dumps({'token': token})}\n\n"
+        if future.exception() is not None:
+            logger.error(f"Streaming generation error: {str(future.exception())}")
+            yield f"data: {json.dumps({'error': str(future.exception()), 'success': False})}\n\n"
+        else:
+            yield f"data: {json.dumps({'done': True, 'success': True, 'model_used': model_key})}\n\n"
+    
+    return Response(stream_with_context(events()), mimetype='text/event-stream')
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -142,60 +390,111 @@ def health_check():
         'status': 'healthy',
         'loaded_models': list(pipes.keys()),
         'available_models': list(MODELS.keys()),
+        'classifiers_loaded': bool(classifiers),
         'device': device,
     })
 
-def quick_categorize(text):
-    """Fast keyword-based categorization (fallback when LLM is too slow)"""
-    text_lower = text.lower()
-    
-    # Only three departments: road, water, waste
-    department = "road"  # Default
-    severity = "low"  # Default severity
-    location = ""
-    
-    # Department detection (only road, water, waste)
-    if any(word in text_lower for word in ['water', 'pipe', 'leak', 'supply', 'tap', 'drinking', 'paani', 'jal']):
-        department = "water"
-    elif any(word in text_lower for word in ['garbage', 'waste', 'trash', 'dump', 'sanitation', 'cleanliness', 'kachra', 'safai']):
-        department = "waste"
-    elif any(word in text_lower for word in ['road', 'pothole', 'street', 'highway', 'pavement', 'sadak', 'rasta']):
-        department = "road"
-    
-    # Severity detection (low, medium, high, critical)
-    if any(word in text_lower for word in ['critical', 'emergency', 'immediate', 'danger', 'life-threatening', 'severe']):
-        severity = "critical"
-    elif any(word in text_lower for word in ['urgent', 'serious', 'important', 'high']):
-        severity = "high"
-    elif any(word in text_lower for word in ['moderate', 'medium', 'normal']):
-        severity = "medium"
-    elif any(word in text_lower for word in ['minor', 'small', 'slight', 'low']):
-        severity = "low"
+# Keyword tables for quick_categorize, in priority order (first matching label wins)
+DEPARTMENT_KEYWORDS = (
+    ('water', ('water', 'pipe', 'leak', 'supply', 'tap', 'drinking', 'paani', 'jal')),
+    ('waste', ('garbage', 'waste', 'trash', 'dump', 'sanitation', 'cleanliness', 'kachra', 'safai')),
+    ('road', ('road', 'pothole', 'street', 'highway', 'pavement', 'sadak', 'rasta')),
+)
+SEVERITY_KEYWORDS = (
+    ('critical', ('critical', 'emergency', 'immediate', 'danger', 'life-threatening', 'severe')),
+    ('high', ('urgent', 'serious', 'important', 'high')),
+    ('medium', ('moderate', 'medium', 'normal')),
+    ('low', ('minor', 'small', 'slight', 'low')),
+)
+
+KEYWORD_TABLES = (('department', DEPARTMENT_KEYWORDS), ('severity', SEVERITY_KEYWORDS))
+
+LOCATION_PATTERNS = (
+    re.compile(r'(?:at|in|near|location:)\s+([A-Z][a-zA-Z\s]+(?:road|street|area|colony|nagar|park)?)'),
+    re.compile(r'([A-Z][a-zA-Z\s]+(?:road|street|area|colony|nagar|park))'),
+)
+
+def _build_keyword_automaton():
+    """Build a single Aho-Corasick automaton over all department/severity keywords"""
+    automaton = ahocorasick.Automaton()
+    for category, table in KEYWORD_TABLES:
+        for label, keywords in table:
+            for keyword in keywords:
+                automaton.add_word(keyword, (category, label))
+    automaton.make_automaton()
+    return automaton
+
+KEYWORD_AUTOMATON = _build_keyword_automaton() if ahocorasick is not None else None
+
+def _index_keywords_by_first_char():
+    """Group keywords by their first character for the pure-Python fallback"""
+    index = {}
+    for category, table in KEYWORD_TABLES:
+        for label, keywords in table:
+            for keyword in keywords:
+                index.setdefault(keyword[0], []).append((keyword, (category, label)))
+    return index
+
+KEYWORDS_BY_FIRST_CHAR = _index_keywords_by_first_char()
+
+def _match_keywords(text_lower):
+    """Return the set of (category, label) pairs whose keywords occur in the text"""
+    if KEYWORD_AUTOMATON is not None:
+        return {match for _, match in KEYWORD_AUTOMATON.iter(text_lower)}
     
-    # Try to extract location (simple approach)
-    import re
-    location_patterns = [
-        r'(?:at|in|near|location:)\s+([A-Z][a-zA-Z\s]+(?:road|street|area|colony|nagar|park)?)',
-        r'([A-Z][a-zA-Z\s]+(?:road|street|area|colony|nagar|park))',
-    ]
-    for pattern in location_patterns:
-        match = re.search(pattern, text)
+    # Only keywords starting with a character present in the text can match, and
+    # a label that already matched needs no further checks
+    matches = set()
+    for char in KEYWORDS_BY_FIRST_CHAR.keys() & set(text_lower):
+        for keyword, match in KEYWORDS_BY_FIRST_CHAR[char]:
+            if match not in matches and keyword in text_lower:
+                matches.add(match)
+    return matches
+
+def _extract_location(text):
+    """Extract a location with simple capitalized-phrase patterns"""
+    for pattern in LOCATION_PATTERNS:
+        match = pattern.search(text)
         if match:
-            location = match.group(1).strip()
-            break
-    
-    # Generate a concise summary (first sentence or up to 100 chars)
-    sentences = text.split('.')
-    summary = sentences[0].strip() if sentences else text[:100]
+            return match.group(1).strip()
+    return ""
+
+def _summarize(text):
+    """Generate a concise summary (first sentence or up to 100 chars)"""
+    # partition stops at the first '.', unlike split which scans the whole text
+    summary = text.partition('.')[0].strip()
     if len(text) > 100 and len(summary) < 100:
-        summary = text[:100].strip() + "..."
-    
-    analysis = f"""Department: {department}
+        return text[:100].strip() + "..."
+    return summary
+
+def _format_analysis(department, severity, location, summary):
+    """Format categorization results the way the frontend parses them"""
+    return f"""Department: {department}
 Severity: {severity}
-Location: {location if location else ''}
+Location: {location}
 Summary: {summary}"""
+
+def quick_categorize(text):
+    """Fast keyword-based categorization (fallback when LLM is too slow)"""
+    matches = _match_keywords(text.lower())
     
-    return analysis
+    # Only three departments: road, water, waste
+    department = next((label for label, _ in DEPARTMENT_KEYWORDS if ('department', label) in matches), "road")
+    severity = next((label for label, _ in SEVERITY_KEYWORDS if ('severity', label) in matches), "low")
+    
+    return _format_analysis(department, severity, _extract_location(text), _summarize(text))
+
+def classify_grievance(text):
+    """Categorize with the fine-tuned encoder classifiers (one forward pass per head)"""
+    department = classifiers['department'](text, truncation=True)[0]['label']
+    severity = classifiers['severity'](text, truncation=True)[0]['label']
+    
+    return _format_analysis(
+        CLASSIFIER_DEPARTMENTS.get(department, department),
+        severity,
+        _extract_location(text),
+        _summarize(text),
+    )
 
 @app.route('/categorize', methods=['POST'])
 def categorize():
@@ -222,6 +521,17 @@ def categorize():
                 'success': True,
                 'model_used': 'fast_keyword_matcher'
             })
+        elif classifiers and not data.get('use_generative'):
+            # Use the fine-tuned encoder classifiers
+            logger.info("Using encoder classifiers")
+            analysis = classify_grievance(grievance_text)
+            
+            return jsonify({
+                'text': analysis,
+                'generated_text': analysis,
+                'success': True,
+                'model_used': 'encoder_classifier'
+            })
         else:
             # Use LLM (slow on CPU)
             model_key = data.get('model', DEFAULT_MODEL)
@@ -232,8 +542,6 @@ def categorize():
                 if not load_model(model_key):
                     return jsonify({'error': f'Failed to load model {model_key}'}), 500
             
-            pipe = pipes[model_key]
-            
             # Create prompt for categorization (shorter for faster response)
             prompt = f"""Analyze this grievance briefly:
 Grievance: {grievance_text}
@@ -248,8 +556,8 @@ Analysis:"""
             
             logger.info(f"Processing grievance with {model_key} model")
             
-            # Generate response with reduced tokens for faster processing
-            result = pipe(prompt, max_new_tokens=150, temperature=0.5)
+            # Greedy decoding with a short token budget (the analysis is plain text, not JSON)
+            result = generate(model_key, prompt, max_new_tokens=128, do_sample=False)
             generated_text = result[0]['generated_text']
             
             # Extract only the analysis part (after the prompt)
@@ -287,8 +595,6 @@ def generate_response():
             if not load_model(model_key):
                 return jsonify({'error': f'Failed to load model {model_key}'}), 500
         
-        pipe = pipes[model_key]
-        
         # Create prompt for response generation
         prompt = f"""Generate a professional and empathetic response to the following citizen grievance:
 
@@ -298,8 +604,12 @@ Response:"""
         
         logger.info(f"Generating response with {model_key} model")
         
+        # Stream tokens as they are generated (llama.cpp models always respond in one piece)
+        if data.get('stream') and hasattr(pipes[model_key], 'tokenizer'):
+            return stream_generation(model_key, prompt, max_new_tokens=400, temperature=0.7)
+        
         # Generate response
-        result = pipe(prompt, max_new_tokens=400, temperature=0.7)
+        result = generate(model_key, prompt, max_new_tokens=400, temperature=0.7)
         generated_text = result[0]['generated_text']
         
         # Extract only the response part
@@ -337,12 +647,10 @@ def process():
             if not load_model(model_key):
                 return jsonify({'error': f'Failed to load model {model_key}'}), 500
         
-        pipe = pipes[model_key]
-        
         logger.info(f"Processing grievance with {model_key} model")
         
-        # Generate response
-        result = pipe(grievance_text, max_new_tokens=500)
+        # Generate the structured output (greedy, stops once the JSON object closes)
+        result = generate(model_key, grievance_text, max_new_tokens=128, do_sample=False, stop_at_json=True)
         generated_text = result[0]['generated_text']
         
         return jsonify({
@@ -359,15 +667,20 @@ def process():
             'success': False
         }), 500
 
+def load_startup_models():
+    """Load the classifiers and the default model before serving requests"""
+    load_classifiers()
+    logger.info(f"Loading default model: {DEFAULT_MODEL}")
+    return load_model(DEFAULT_MODEL)
+
 if __name__ == '__main__':
     logger.info("Starting Grievance Processing Local Server...")
     
     # Load default model on startup
-    logger.info(f"Loading default model: {DEFAULT_MODEL}")
-    if load_model(DEFAULT_MODEL):
+    if load_startup_models():
         port = int(os.getenv('PORT', 5002))
         logger.info(f"Server starting on port {port}")
-        app.run(host='0.0.0.0', port=port, debug=False)
+        app.run(host='0.0.0.0', port=port, debug=False, threaded=True)
     else:
         logger.error("Failed to load default model. Exiting.")
         exit(1)
@@ -35,5 +35,5 @@ echo ""
 echo "Press Ctrl+C to stop the server"
 echo ""
 
-# Start the server
-python server.py
+# Start the server (gunicorn loads the model once and serves requests on worker threads)
+exec gunicorn -c gunicorn.conf.py server:app
@@ -94,6 +94,83 @@ export async function generateGrievanceResponseLocal(
   }
 }
 
+/**
+ * Stream a response to a grievance from the local server, token by token.
+ * `onToken` is called with each piece of text as soon as the server emits it.
+ */
+export async function streamGrievanceResponseLocal(
+  text: string,
+  onToken: (token: string) => void,
+  model: 'llama' | 'mistral' | 'qwen' = 'mistral'
+): Promise<GrievanceResult> {
+  try {
+    const response = await fetch(`${LOCAL_GRIEVANCE_URL}/generate-response`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({ text, model, stream: true }),
+    });
+
+    if (!response.ok) {
+      throw new Error(`Server error: ${response.status}`);
+    }
+
+    // llama.cpp models answer with a regular JSON body instead of a stream
+    if (!response.headers.get('Content-Type')?.includes('text/event-stream') || !response.body) {
+      const result = await response.json();
+      onToken(result.text);
+      return result;
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let fullText = '';
+    let modelUsed: string | undefined;
+
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      // Server-sent events are separated by a blank line
+      const events = buffer.split('\n\n');
+      buffer = events.pop() ?? '';
+      for (const event of events) {
+        if (!event.startsWith('data: ')) continue;
+        const data = JSON.parse(event.slice('data: '.length));
+        if (data.error) {
+          throw new Error(data.error);
+        }
+        if (data.token) {
+          fullText += data.token;
+          onToken(data.token);
+        }
+        if (data.done) {
+          modelUsed = data.model_used;
+        }
+      }
+    }
+
+    const responseText = fullText.trim();
+    return {
+      text: responseText,
+      generated_text: responseText,
+      success: true,
+      model_used: modelUsed,
+    };
+  } catch (error) {
+    console.error('Local response streaming error:', error);
+    return {
+      text: '',
+      generated_text: '',
+      success: false,
+      error: error instanceof Error ? error.message : 'Unknown error',
+    };
+  }
+}
+
 /**
  * Process grievance using local server
  */
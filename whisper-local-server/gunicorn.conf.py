@@ -0,0 +1,39 @@
+"""
+Gunicorn configuration for the Whisper Hindi2Hinglish Local Server
+
+A single worker keeps one copy of the model (and one CUDA context); its
+threads decode uploads concurrently and feed the transcription batcher.
+The app is not preloaded: a CUDA context created in the master process
+cannot be used after the fork, so the worker loads the model itself.
+"""
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+bind = f"0.0.0.0:{os.getenv('PORT', 5000)}"
+workers = 1
+worker_class = "gthread"
+threads = int(os.getenv('GUNICORN_THREADS', 16))
+timeout = 120
+
+
+def post_fork(arbiter, worker):
+    """Load the models in the worker process, after the fork"""
+    import threading
+    import server
+
+    # Keep the worker's heartbeat going so a first-run download or conversion
+    # isn't mistaken for a hung worker and killed after `timeout` seconds
+    loaded = threading.Event()
+
+    def heartbeat():
+        while not loaded.wait(5):
+            worker.notify()
+
+    threading.Thread(target=heartbeat, daemon=True).start()
+    try:
+        if not server.load_startup_models():
+            raise RuntimeError(f"Failed to load model {server.MODEL_NAME}")
+    finally:
+        loaded.set()
@@ -4,16 +4,56 @@ Local Whisper Hindi2Hinglish Transcription Server
 Runs the Oriserve/Whisper-Hindi2Hinglish-Swift model locally
 """
 
+import os
+import importlib.util
+
+# Set up cache directory (huggingface_hub reads these when transformers is imported)
+CACHE_DIR = os.path.expanduser("~/.cache/huggingface/hub")
+os.environ['HF_HOME'] = os.path.expanduser("~/.cache/huggingface")
+os.environ.setdefault('HF_HUB_CACHE', CACHE_DIR)
+os.environ['TRANSFORMERS_CACHE'] = CACHE_DIR  # older transformers releases
+# Parallel first-run downloads through hf_transfer, when it is installed
+if importlib.util.find_spec('hf_transfer') is not None:
+    os.environ.setdefault('HF_HUB_ENABLE_HF_TRANSFER', '1')
+
+# Three models share the GPU; expandable segments keep bursty summarize/translate
+# allocations from fragmenting memory (read when torch initialises CUDA)
+os.environ.setdefault('PYTORCH_CUDA_ALLOC_CONF', 'expandable_segments:True,max_split_size_mb:128')
+
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from transformers import AutoModelForSpeechSeq2Seq, AutoProcessor, pipeline, AutoModelForSeq2SeqLM, AutoTokenizer
+from transformers.pipelines.audio_utils import ffmpeg_read
 import torch
-import os
+import numpy as np
+import soundfile as sf
+import io
+import re
 from dotenv import load_dotenv
-import tempfile
 import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from functools import lru_cache
 from pathlib import Path
 
+try:
+    from faster_whisper import WhisperModel
+    from ctranslate2.converters import TransformersConverter
+except ImportError:  # faster-whisper is optional, the Transformers pipeline is used without it
+    WhisperModel = None
+
+try:
+    import pybase64 as base64
+except ImportError:  # pybase64 is optional, its SIMD decoder is a drop-in for the stdlib one
+    import base64
+
+try:
+    from optimum.onnxruntime import ORTModelForSpeechSeq2Seq
+except ImportError:  # optimum is optional, only needed for the ONNX Runtime / TensorRT backend
+    ORTModelForSpeechSeq2Seq = None
+
 # Load environment variables
 load_dotenv()
 
@@ -21,10 +61,6 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Set up cache directory
-CACHE_DIR = os.path.expanduser("~/.cache/huggingface/hub")
-os.environ['TRANSFORMERS_CACHE'] = CACHE_DIR
-os.environ['HF_HOME'] = os.path.expanduser("~/.cache/huggingface")
 logger.info(f"Using cache directory: {CACHE_DIR}")
 
 app = Flask(__name__)
@@ -35,17 +71,186 @@ MODEL_NAME = "Oriserve/Whisper-Hindi2Hinglish-Swift"
 device = "cuda:0" if torch.cuda.is_available() else "cpu"
 torch_dtype = torch.float16 if torch.cuda.is_available() else torch.float32
 
+if torch.cuda.is_available():
+    # Let cuDNN pick the fastest conv kernels for the (fixed 30 s) mel input, and
+    # run remaining FP32 matmuls on TF32 tensor cores (Ampere and newer)
+    torch.backends.cudnn.benchmark = True
+    torch.backends.cuda.matmul.allow_tf32 = True
+    torch.backends.cudnn.allow_tf32 = True
+    torch.set_float32_matmul_precision("high")
+
+# Compile the decoder forward pass with a static KV cache (GPU only, TORCH_COMPILE=1 to enable).
+# Every batch size is a separate graph, so startup warms up all sizes up to MAX_BATCH
+TORCH_COMPILE = torch.cuda.is_available() and os.getenv('TORCH_COMPILE', '0') == '1'
+
+# INT8 dynamic quantization of Linear layers on CPU (QUANTIZE_CPU=0 to disable)
+QUANTIZE_CPU = device == "cpu" and os.getenv('QUANTIZE_CPU', '1') == '1'
+
+# CTranslate2 (faster-whisper) conversion of the model, created on first start
+CT2_MODEL_DIR = os.getenv('CT2_MODEL_DIR', str(Path(__file__).resolve().parent / 'ct2-model'))
+ct2_device = "cuda" if torch.cuda.is_available() else "cpu"
+ct2_compute_type = "float16" if torch.cuda.is_available() else "int8"
+
+# Decoding settings: greedy, without conditioning on earlier windows; grievance
+# clips are short, so 96 tokens covers a 30 second window of speech
+MAX_NEW_TOKENS = int(os.getenv('MAX_NEW_TOKENS', 96))
+GENERATE_KWARGS = {
+    "language": "english",  # Force English output
+    "task": "transcribe",
+    "num_beams": 1,
+    "do_sample": False,
+    "max_new_tokens": MAX_NEW_TOKENS,
+    "condition_on_prev_tokens": False,
+}
+
+# Whisper's input rate and window; clips up to one window skip the pipeline and
+# have their log-mel features computed on the request thread
+SAMPLING_RATE = 16000
+WINDOW_SAMPLES = 30 * SAMPLING_RATE
+
+# ONNX Runtime backend with the TensorRT provider (GPU only, USE_ONNX_TRT=1 to enable)
+USE_ONNX_TRT = ORTModelForSpeechSeq2Seq is not None and torch.cuda.is_available() and os.getenv('USE_ONNX_TRT', '0') == '1'
+TRT_CACHE_DIR = os.getenv('TRT_CACHE_DIR', str(Path(__file__).resolve().parent / 'trt-cache'))
+TRT_CALIBRATION_TABLE = os.getenv('TRT_CALIBRATION_TABLE', 'calibration.flatbuffers')
+
+# Concurrent transcriptions on the Transformers pipeline are coalesced into
+# batches by a single worker thread (CTranslate2 handles concurrent calls itself)
+MAX_BATCH = int(os.getenv('MAX_BATCH', 8))
+MAX_WAIT_MS = int(os.getenv('MAX_WAIT_MS', 20))
+TRANSCRIBE_TIMEOUT = int(os.getenv('TRANSCRIBE_TIMEOUT', 120))
+transcription_queue = queue.Queue()
+transcription_worker = None
+worker_lock = threading.Lock()
+
 # Global variables for model and processor
 model = None
 processor = None
 pipe = None
+ct2_model = None
 summarizer = None
 translator = None
+summarizer_lock = threading.Lock()
+translator_lock = threading.Lock()
+
+# Load the summarizer and translator at startup rather than on first use (PRELOAD_MODELS=0 to disable)
+PRELOAD_MODELS = os.getenv('PRELOAD_MODELS', '1') == '1'
+
+# Long texts are summarized in windows of SUMMARY_WINDOW tokens overlapping by SUMMARY_OVERLAP
+SUMMARY_WINDOW = 900
+SUMMARY_OVERLAP = 100
+
+# opus-mt reads at most 512 tokens, so longer texts are translated in sentence
+# groups of up to TRANSLATION_WINDOW tokens
+TRANSLATION_WINDOW = 400
+SENTENCE_END = re.compile(r'(?<=[.!?।])\s+')
+
+# Recent summaries and translations are kept in memory, since the frontend
+# often resubmits the same transcript
+RESULT_CACHE_SIZE = 512
+
+def from_cache_or_hub(cls, name, **kwargs):
+    """from_pretrained that reads cached files without contacting the Hub, downloading only when missing"""
+    try:
+        return cls.from_pretrained(name, local_files_only=True, cache_dir=CACHE_DIR, **kwargs)
+    except OSError:
+        return cls.from_pretrained(name, cache_dir=CACHE_DIR, **kwargs)
+
+def load_ct2_model():
+    """Load the CTranslate2 build of the model with faster-whisper, converting it once if needed"""
+    global ct2_model
+    
+    if not (Path(CT2_MODEL_DIR) / "model.bin").exists():
+        logger.info(f"Converting {MODEL_NAME} to CTranslate2 format in {CT2_MODEL_DIR} (one-time only)...")
+        converter = TransformersConverter(
+            MODEL_NAME,
+            copy_files=["tokenizer.json", "preprocessor_config.json"],
+        )
+        converter.convert(CT2_MODEL_DIR, quantization="float16", force=True)
+    
+    logger.info(f"Loading CTranslate2 model on {ct2_device} ({ct2_compute_type})...")
+    ct2_model = WhisperModel(CT2_MODEL_DIR, device=ct2_device, compute_type=ct2_compute_type)
+    logger.info("Model loaded successfully!")
+
+def load_onnx_model():
+    """Export the model to ONNX once and run it with TensorRT, falling back to the CUDA provider"""
+    os.makedirs(TRT_CACHE_DIR, exist_ok=True)
+    
+    onnx_dir = Path(TRT_CACHE_DIR) / "onnx"
+    if not (onnx_dir / "config.json").exists():
+        logger.info(f"Exporting {MODEL_NAME} to ONNX in {onnx_dir} (one-time only)...")
+        exported = ORTModelForSpeechSeq2Seq.from_pretrained(MODEL_NAME, export=True, cache_dir=CACHE_DIR)
+        # Saved under a temporary name first so an interrupted export is never reused
+        tmp_dir = onnx_dir.with_name("onnx.tmp")
+        exported.save_pretrained(tmp_dir)
+        os.replace(tmp_dir, onnx_dir)
+        del exported
+    
+    # Built engines are cached on disk, so the TensorRT build cost is paid once per GPU
+    trt_options = {
+        "trt_fp16_enable": True,
+        "trt_engine_cache_enable": True,
+        "trt_engine_cache_path": TRT_CACHE_DIR,
+    }
+    if (Path(TRT_CACHE_DIR) / TRT_CALIBRATION_TABLE).exists():
+        logger.info(f"Using INT8 calibration table {TRT_CALIBRATION_TABLE}")
+        trt_options["trt_int8_enable"] = True
+        trt_options["trt_int8_calibration_table_name"] = TRT_CALIBRATION_TABLE
+    
+    try:
+        logger.info("Loading ONNX model with TensorrtExecutionProvider...")
+        return ORTModelForSpeechSeq2Seq.from_pretrained(
+            onnx_dir,
+            export=False,
+            provider="TensorrtExecutionProvider",
+            provider_options=trt_options
+        )
+    except Exception as e:
+        logger.warning(f"TensorRT provider unavailable: {str(e)} - using CUDAExecutionProvider")
+        return ORTModelForSpeechSeq2Seq.from_pretrained(
+            onnx_dir,
+            export=False,
+            provider="CUDAExecutionProvider"
+        )
+
+def warm_up(name, run):
+    """Run a throwaway input through a freshly loaded model; a failure only skips the warmup"""
+    logger.info(f"Warming up {name.lower()}...")
+    try:
+        with torch.inference_mode():
+            run()
+    except Exception as e:
+        logger.warning(f"{name} warmup failed: {str(e)}")
+
+def warm_up_transcription():
+    """Transcribe a second of silence on every path requests take through the loaded backend"""
+    silence = np.zeros(SAMPLING_RATE, dtype=np.float32)
+    if ct2_model is not None:
+        segments, _ = ct2_model.transcribe(silence, language="en", task="transcribe", beam_size=1, max_new_tokens=MAX_NEW_TOKENS)
+        list(segments)  # segments are decoded lazily
+        return
+    # Runs through the batch worker: compiled CUDA graphs are recorded per thread, so
+    # warming up on the loading thread would leave the worker to re-record them.
+    # The batcher sends 1..MAX_BATCH clips at a time, and each size is its own graph
+    features = extract_features(silence)
+    for batch_size in range(1, MAX_BATCH + 1 if TORCH_COMPILE else 2):
+        futures = [submit_transcription(features) for _ in range(batch_size)]
+        for future in futures:
+            future.result(timeout=TRANSCRIBE_TIMEOUT)
+    # Raw arrays take the pipeline path
+    submit_transcription(silence).result(timeout=TRANSCRIBE_TIMEOUT)
 
 def load_model():
     """Load the Whisper model and processor"""
     global model, processor, pipe
     
+    if WhisperModel is not None and not USE_ONNX_TRT:
+        try:
+            load_ct2_model()
+            warm_up("CTranslate2 model", warm_up_transcription)
+            return True
+        except Exception as e:
+            logger.warning(f"Error loading CTranslate2 model: {str(e)} - falling back to Transformers")
+    
     logger.info(f"Loading model: {MODEL_NAME}")
     logger.info(f"Using device: {device}")
     logger.info(f"Cache directory: {CACHE_DIR}")
@@ -58,18 +263,38 @@ def load_model():
         logger.info("⬇️  Model not in cache - will download (~2GB, one-time only)")
     
     try:
-        # Load model with explicit cache directory
-        model = AutoModelForSpeechSeq2Seq.from_pretrained(
-            MODEL_NAME,
-            torch_dtype=torch_dtype,
-            low_cpu_mem_usage=True,
-            use_safetensors=True,
-            cache_dir=CACHE_DIR
-        )
-        model.to(device)
+        if USE_ONNX_TRT:
+            model = load_onnx_model()
+        else:
+            # Load model with explicit cache directory
+            model = from_cache_or_hub(
+                AutoModelForSpeechSeq2Seq,
+                MODEL_NAME,
+                torch_dtype=torch_dtype,
+                low_cpu_mem_usage=True,
+                use_safetensors=True,
+                attn_implementation="sdpa"
+            )
+            model.to(device)
+            
+            if QUANTIZE_CPU:
+                # Linear weights become INT8 (conv1d mel frontend stays FP32 to keep accuracy)
+                engines = torch.backends.quantized.supported_engines
+                torch.backends.quantized.engine = 'fbgemm' if 'fbgemm' in engines else 'qnnpack'
+                logger.info(f"Quantizing Linear layers to INT8 ({torch.backends.quantized.engine})...")
+                model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            
+            if TORCH_COMPILE:
+                # A static cache keeps KV tensor shapes fixed, so the compiled graph is reused across requests
+                logger.info("Compiling model forward pass with torch.compile (static KV cache)...")
+                model.generation_config.cache_implementation = "static"
+                model.forward = torch.compile(model.forward, mode="reduce-overhead", fullgraph=False)
+        
+        # language/task are passed per call; stale forced ids from the checkpoint would conflict with them
+        model.generation_config.forced_decoder_ids = None
         
         # Load processor with cache
-        processor = AutoProcessor.from_pretrained(MODEL_NAME, cache_dir=CACHE_DIR)
+        processor = from_cache_or_hub(AutoProcessor, MODEL_NAME)
         
         # Fix tokenizer pad_token issue
         if processor.tokenizer.pad_token is None:
@@ -82,15 +307,16 @@ def load_model():
             model=model,
             tokenizer=processor.tokenizer,
             feature_extractor=processor.feature_extractor,
-            max_new_tokens=128,
             chunk_length_s=30,
-            batch_size=1,  # Reduced batch size to avoid issues
+            batch_size=MAX_BATCH,
             return_timestamps=False,
-            torch_dtype=torch_dtype,
             device=device,
-            generate_kwargs={"language": "english", "task": "transcribe"}  # Force English output
+            generate_kwargs=GENERATE_KWARGS
         )
         
+        # Pay kernel selection (and torch.compile capture) now rather than on the first request
+        warm_up("Transcription model", warm_up_transcription)
+        
         logger.info("Model loaded successfully!")
         return True
     except Exception as e:
@@ -98,62 +324,248 @@ def load_model():
         return False
 
 def load_summarizer():
-    """Load the summarization model (optional, loaded on first use)"""
+    """Load the summarization model (optional, loaded in the background or on first use)"""
     global summarizer
     
-    if summarizer is not None:
-        return True
-    
-    try:
-        logger.info("Loading summarization model...")
-        summarizer = pipeline(
-            "summarization",
-            model="facebook/bart-large-cnn",
-            device=device,
-            torch_dtype=torch_dtype,
-            cache_dir=CACHE_DIR
-        )
-        logger.info("Summarization model loaded successfully!")
-        return True
-    except Exception as e:
-        logger.error(f"Error loading summarization model: {str(e)}")
-        return False
+    # A request arriving while the background load runs waits for it instead of loading again
+    with summarizer_lock:
+        if summarizer is not None:
+            return True
+        
+        try:
+            logger.info("Loading summarization model...")
+            summarizer = pipeline(
+                "summarization",
+                model="facebook/bart-large-cnn",
+                device=device,
+                torch_dtype=torch_dtype,
+                model_kwargs={"low_cpu_mem_usage": True},
+                cache_dir=CACHE_DIR
+            )
+            warm_up("Summarization model", lambda: summarizer("warmup " * 100, max_length=30, min_length=10))
+            logger.info("Summarization model loaded successfully!")
+            return True
+        except Exception as e:
+            logger.error(f"Error loading summarization model: {str(e)}")
+            return False
 
 def load_translator():
-    """Load the translation model (optional, loaded on first use)"""
+    """Load the translation model (optional, loaded in the background or on first use)"""
     global translator
     
-    if translator is not None:
-        return True
-    
-    try:
-        logger.info("Loading translation model (facebook/mbart-large-50-many-to-many-mmt)...")
-        # Use a more robust translation model
-        translator = pipeline(
-            "translation_hi_to_en",
-            model="facebook/mbart-large-50-many-to-many-mmt",
-            device=device,
-            src_lang="hi_IN",
-            tgt_lang="en_XX",
-            cache_dir=CACHE_DIR
-        )
-        logger.info("Translation model loaded successfully!")
-        return True
-    except Exception as e:
-        logger.error(f"Error loading translation model: {str(e)}")
-        # Fallback: try simpler model
+    with translator_lock:
+        if translator is not None:
+            return True
+        
         try:
-            logger.info("Trying alternative translation model (Helsinki-NLP/opus-mt-hi-en)...")
+            # A dedicated hi->en MarianMT model (~74M params) instead of many-to-many mBART-50 (~610M)
+            logger.info("Loading translation model (Helsinki-NLP/opus-mt-hi-en)...")
             from transformers import MarianMTModel, MarianTokenizer
             model_name = "Helsinki-NLP/opus-mt-hi-en"
-            tokenizer = MarianTokenizer.from_pretrained(model_name, cache_dir=CACHE_DIR)
-            model = MarianMTModel.from_pretrained(model_name, cache_dir=CACHE_DIR)
+            tokenizer = from_cache_or_hub(MarianTokenizer, model_name)
+            model = from_cache_or_hub(
+                MarianMTModel,
+                model_name,
+                torch_dtype=torch_dtype,
+                low_cpu_mem_usage=True
+            )
             translator = pipeline("translation", model=model, tokenizer=tokenizer, device=device)
-            logger.info("Alternative translation model loaded successfully!")
+            warm_up("Translation model", lambda: translator("नमस्ते"))
+            logger.info("Translation model loaded successfully!")
             return True
-        except Exception as e2:
-            logger.error(f"Error loading alternative translation model: {str(e2)}")
-            return False
+        except Exception as e:
+            logger.error(f"Error loading translation model: {str(e)}")
+            # Fallback: try the larger multilingual model
+            try:
+                logger.info("Trying alternative translation model (facebook/mbart-large-50-many-to-many-mmt)...")
+                translator = pipeline(
+                    "translation_hi_to_en",
+                    model="facebook/mbart-large-50-many-to-many-mmt",
+                    device=device,
+                    torch_dtype=torch_dtype,
+                    model_kwargs={"low_cpu_mem_usage": True},
+                    src_lang="hi_IN",
+                    tgt_lang="en_XX",
+                    cache_dir=CACHE_DIR
+                )
+                warm_up("Translation model", lambda: translator("नमस्ते"))
+                logger.info("Alternative translation model loaded successfully!")
+                return True
+            except Exception as e2:
+                logger.error(f"Error loading alternative translation model: {str(e2)}")
+                return False
+
+def preload_optional_models():
+    """Load the summarizer and translator in background threads so first requests don't wait"""
+    if not PRELOAD_MODELS:
+        return
+    for loader in (load_summarizer, load_translator):
+        threading.Thread(target=loader, name=loader.__name__, daemon=True).start()
+
+def _transcription_loop():
+    """Drain the transcription queue, running up to MAX_BATCH inputs per model call"""
+    while True:
+        batch = [transcription_queue.get()]
+        deadline = time.monotonic() + MAX_WAIT_MS / 1000
+        while len(batch) < MAX_BATCH:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(transcription_queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        
+        # Precomputed features are decoded with one generate() call; longer or
+        # resampled audio goes through the pipeline, which chunks it
+        features = [item for item in batch if isinstance(item[0], torch.Tensor)]
+        raw_audio = [item for item in batch if not isinstance(item[0], torch.Tensor)]
+        with torch.inference_mode(), torch.autocast("cuda", dtype=torch.float16, enabled=device != "cpu"):
+            if features:
+                _run_batch(features, _generate_batch)
+            if raw_audio:
+                _run_batch(raw_audio, lambda inputs: pipe(inputs, batch_size=len(inputs)))
+
+def _run_batch(items, run):
+    """Run a list of (audio, future) items through run() and resolve their futures"""
+    try:
+        results = run([audio for audio, _ in items])
+    except Exception as e:
+        for _, future in items:
+            future.set_exception(e)
+    else:
+        for (_, future), result in zip(items, results):
+            future.set_result(result)
+
+def _generate_batch(features):
+    """Decode a batch of log-mel feature tensors with the model directly"""
+    feature_dtype = torch.float32 if USE_ONNX_TRT else torch_dtype
+    input_features = torch.cat(features).to(feature_dtype)
+    if device != "cpu":
+        # The batch is assembled in pinned memory so the host-to-device copy runs asynchronously
+        input_features = input_features.pin_memory().to(device, non_blocking=True)
+    predicted_ids = model.generate(input_features=input_features, **GENERATE_KWARGS)
+    return [{'text': text} for text in processor.batch_decode(predicted_ids, skip_special_tokens=True)]
+
+def extract_features(array):
+    """Compute Whisper log-mel features for a clip of up to 30 seconds"""
+    return processor.feature_extractor(array, sampling_rate=SAMPLING_RATE, return_tensors="pt").input_features
+
+def submit_transcription(audio):
+    """Queue audio for batched transcription and return a Future for its pipeline result"""
+    global transcription_worker
+    
+    # Started lazily: a thread started before a server forks would not exist in the worker
+    with worker_lock:
+        if transcription_worker is None or not transcription_worker.is_alive():
+            transcription_worker = threading.Thread(target=_transcription_loop, name='transcription-worker', daemon=True)
+            transcription_worker.start()
+    
+    future = Future()
+    transcription_queue.put((audio, future))
+    return future
+
+def decode_audio(audio_bytes):
+    """Decode uploaded audio in memory into an input for the loaded backend"""
+    if ct2_model is not None:
+        # faster-whisper decodes and resamples file-like objects itself (PyAV)
+        return io.BytesIO(audio_bytes)
+    
+    try:
+        array, sampling_rate = sf.read(io.BytesIO(audio_bytes), dtype="float32")
+    except RuntimeError:
+        # Formats libsndfile cannot read (e.g. browser webm/opus) are piped
+        # through ffmpeg's stdin, which also resamples them
+        return ffmpeg_read(audio_bytes, SAMPLING_RATE)
+    
+    if array.ndim > 1:
+        array = array.mean(axis=1)
+    if sampling_rate == SAMPLING_RATE:
+        return array
+    # The pipeline resamples to the feature extractor's rate
+    return {"raw": array, "sampling_rate": sampling_rate}
+
+def transcribe_audio(audio):
+    """Transcribe audio with the loaded backend and return the text"""
+    if ct2_model is not None:
+        segments, _ = ct2_model.transcribe(
+            audio,
+            language="en",
+            task="transcribe",
+            beam_size=1,
+            max_new_tokens=MAX_NEW_TOKENS,
+            condition_on_previous_text=False,
+            vad_filter=True
+        )
+        return "".join(segment.text for segment in segments).strip()
+    if isinstance(audio, np.ndarray) and len(audio) <= WINDOW_SAMPLES:
+        # Runs on the request thread, overlapping with the worker's decoding of other requests
+        audio = extract_features(audio)
+    return submit_transcription(audio).result(timeout=TRANSCRIBE_TIMEOUT)['text'].strip()
+
+def release_cached_memory():
+    """Return cached GPU blocks after an infrequent summarize/translate call (not per transcription)"""
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+@lru_cache(maxsize=RESULT_CACHE_SIZE)
+def summarize_text(text, max_length, min_length):
+    """Summarize text of any length in overlapping token windows, batched in one pipeline call"""
+    # The fast tokenizer is shared by request threads and switches truncation settings
+    # between the calls below, so the whole summarization holds the summarizer's lock
+    with summarizer_lock:
+        tokenizer = summarizer.tokenizer
+        ids = tokenizer(text, add_special_tokens=False)['input_ids']
+        
+        # BART reads at most 1024 tokens, so longer texts are split rather than truncated
+        if len(ids) <= SUMMARY_WINDOW:
+            chunks = [text]
+        else:
+            step = SUMMARY_WINDOW - SUMMARY_OVERLAP
+            chunks = [tokenizer.decode(ids[i:i + SUMMARY_WINDOW]) for i in range(0, len(ids) - SUMMARY_OVERLAP, step)]
+        
+        gen_kwargs = {"max_length": max_length, "min_length": min_length, "do_sample": False, "truncation": True}
+        with torch.inference_mode():
+            results = summarizer(chunks, batch_size=4, **gen_kwargs)
+            summary = " ".join(result['summary_text'] for result in results)
+            
+            # Condense the joined window summaries when they overflow the requested length
+            if len(chunks) > 1 and len(tokenizer(summary)['input_ids']) > max_length:
+                summary = summarizer(summary, **gen_kwargs)[0]['summary_text']
+    
+    return summary
+
+def translation_chunks(text):
+    """Split text into whole sentences grouped up to TRANSLATION_WINDOW tokens"""
+    tokenizer = translator.tokenizer
+    if len(tokenizer(text, add_special_tokens=False)['input_ids']) <= TRANSLATION_WINDOW:
+        return [text]
+    
+    chunks, current, current_len = [], [], 0
+    for sentence in SENTENCE_END.split(text.strip()):
+        ids = tokenizer(sentence, add_special_tokens=False)['input_ids']
+        if current and current_len + len(ids) > TRANSLATION_WINDOW:
+            chunks.append(" ".join(current))
+            current, current_len = [], 0
+        if len(ids) > TRANSLATION_WINDOW:
+            # Unpunctuated transcripts have no sentence breaks; cut them into token windows
+            chunks.extend(
+                tokenizer.decode(ids[i:i + TRANSLATION_WINDOW], skip_special_tokens=True)
+                for i in range(0, len(ids), TRANSLATION_WINDOW)
+            )
+            continue
+        current.append(sentence)
+        current_len += len(ids)
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+@lru_cache(maxsize=RESULT_CACHE_SIZE)
+def translate_text(text):
+    """Translate text of any length with the local translation model, batched in one pipeline call"""
+    with translator_lock, torch.inference_mode():
+        results = translator(translation_chunks(text), batch_size=8, truncation=True)
+    return " ".join(result['translation_text'] for result in results)
 
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -162,13 +574,14 @@ def health_check():
         'status': 'healthy',
         'model': MODEL_NAME,
         'device': device,
-        'model_loaded': pipe is not None
+        'model_loaded': ct2_model is not None or pipe is not None,
+        'backend': 'ctranslate2' if ct2_model is not None else ('onnxruntime' if USE_ONNX_TRT else 'transformers'),
     })
 
 @app.route('/transcribe', methods=['POST'])
 def transcribe():
     """Transcribe audio file"""
-    if pipe is None:
+    if ct2_model is None and pipe is None:
         return jsonify({'error': 'Model not loaded'}), 500
     
     try:
@@ -178,23 +591,15 @@ def transcribe():
         
         audio_file = request.files['audio']
         
-        # Save to temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as temp_audio:
-            audio_file.save(temp_audio.name)
-            temp_path = temp_audio.name
-        
         logger.info(f"Processing audio file: {audio_file.filename}")
         
         # Transcribe
-        result = pipe(temp_path)
-        
-        # Clean up temporary file
-        os.unlink(temp_path)
+        text = transcribe_audio(decode_audio(audio_file.read()))
         
         logger.info("Transcription completed successfully")
         
         return jsonify({
-            'text': result['text'],
+            'text': text,
             'success': True
         })
         
@@ -208,7 +613,7 @@ def transcribe():
 @app.route('/transcribe-base64', methods=['POST'])
 def transcribe_base64():
     """Transcribe audio from base64 encoded data"""
-    if pipe is None:
+    if ct2_model is None and pipe is None:
         return jsonify({'error': 'Model not loaded'}), 500
     
     try:
@@ -217,26 +622,17 @@ def transcribe_base64():
         if 'audio' not in data:
             return jsonify({'error': 'No audio data provided'}), 400
         
-        import base64
-        audio_bytes = base64.b64decode(data['audio'])
-        
-        # Save to temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as temp_audio:
-            temp_audio.write(audio_bytes)
-            temp_path = temp_audio.name
+        audio_bytes = base64.b64decode(data['audio'], validate=False)
         
         logger.info("Processing base64 audio data")
         
         # Transcribe
-        result = pipe(temp_path)
-        
-        # Clean up temporary file
-        os.unlink(temp_path)
+        text = transcribe_audio(decode_audio(audio_bytes))
         
         logger.info("Transcription completed successfully")
         
         return jsonify({
-            'text': result['text'],
+            'text': text,
             'success': True
         })
         
@@ -267,17 +663,12 @@ def summarize():
         logger.info(f"Summarizing text (length: {len(text)} chars)")
         
         # Summarize
-        result = summarizer(
-            text,
-            max_length=max_length,
-            min_length=min_length,
-            do_sample=False
-        )
+        summary_text = summarize_text(text, max_length, min_length)
         
         logger.info("Summarization completed successfully")
         
         return jsonify({
-            'summary_text': result[0]['summary_text'],
+            'summary_text': summary_text,
             'success': True
         })
         
@@ -287,10 +678,12 @@ def summarize():
             'error': str(e),
             'success': False
         }), 500
+    finally:
+        release_cached_memory()
 
 @app.route('/translate', methods=['POST'])
 def translate():
-    """Translate Hinglish/Hindi text to English using Google Translate API"""
+    """Translate Hinglish/Hindi text to English with the local model, or Google Translate as a fallback"""
     try:
         data = request.get_json()
         
@@ -301,6 +694,21 @@ def translate():
         
         logger.info(f"Translating text: {text[:50]}...")
         
+        # Translate in-process; Google Translate is only used when the local model is unavailable
+        try:
+            if load_translator():
+                translated_text = translate_text(text)
+                
+                logger.info(f"Translation completed: {translated_text[:50]}...")
+                
+                return jsonify({
+                    'translated_text': translated_text,
+                    'original_text': text,
+                    'success': True
+                })
+        except Exception as e:
+            logger.warning(f"Local translation failed: {str(e)} - falling back to Google Translate")
+        
         # Use googletrans library for simple translation
         try:
             from googletrans import Translator
@@ -331,15 +739,24 @@ def translate():
             'error': str(e),
             'success': False
         }), 500
+    finally:
+        release_cached_memory()
+
+def load_startup_models():
+    """Load the Whisper model, then start loading the optional models in the background"""
+    if not load_model():
+        return False
+    preload_optional_models()
+    return True
 
 if __name__ == '__main__':
     logger.info("Starting Whisper Hindi2Hinglish Local Server...")
     
     # Load model on startup
-    if load_model():
+    if load_startup_models():
         port = int(os.getenv('PORT', 5000))
         logger.info(f"Server starting on port {port}")
-        app.run(host='0.0.0.0', port=port, debug=False)
+        app.run(host='0.0.0.0', port=port, debug=False, threaded=True)
     else:
         logger.error("Failed to load model. Exiting.")
         exit(1)
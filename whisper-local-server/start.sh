@@ -26,5 +26,5 @@ echo ""
 echo "Press Ctrl+C to stop the server"
 echo ""
 
-# Start the server
-python server.py
+# Start the server (gunicorn serves requests on worker threads, see gunicorn.conf.py)
+exec gunicorn -c gunicorn.conf.py server:app